@@ -4,17 +4,45 @@ Supports both text and audio analysis using various models
 """
 
 import os
-import json
+import re
+import shutil
+import tempfile
+import orjson
 import numpy as np
 from typing import Dict, List, Optional, Tuple
 import librosa
 import torch
-from transformers import pipeline, AutoTokenizer, AutoModel
+from torch.ao.quantization import quantize_dynamic
+from numba import njit, prange
+from transformers import (
+    AutoTokenizer, 
+    AutoModelForSequenceClassification, 
+    AutoFeatureExtractor, 
+    AutoModelForAudioClassification
+)
 import google.generativeai as genai
 from dataclasses import dataclass
 from datetime import datetime
 import asyncio
 import aiohttp
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_right
+from functools import partial
+from hashlib import blake2b
+
+# Optional: ONNX Runtime backend for the text models
+try:
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+except ImportError:
+    ort = None
+
+# Where exported ONNX text models are kept between runs
+ONNX_CACHE_DIR = os.getenv(
+    'EMOTION_ONNX_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'emotion-detection', 'onnx')
+)
 
 @dataclass
 class EmotionResult:
@@ -24,14 +52,476 @@ class EmotionResult:
     intensity: str
     additional_metrics: Dict[str, float]
 
+# Audio model labels mapped to our emotion labels; the short forms are the
+# labels emitted by superb/hubert-large-superb-er
+_AUDIO_EMOTION_MAP = {
+    'angry': 'frustrated',
+    'ang': 'frustrated',
+    'calm': 'calm',
+    'disgust': 'disappointed',
+    'fearful': 'nervous',
+    'happy': 'happy',
+    'hap': 'happy',
+    'neutral': 'neutral',
+    'neu': 'neutral',
+    'sad': 'disappointed',
+    'surprised': 'excited'
+}
+
+# Fixed label vocabularies used to encode EmotionResultBatch columns
+EMOTIONS = (
+    'neutral', 'happy', 'joy', 'optimism', 'confident', 'calm', 'excited',
+    'surprise', 'nervous', 'fear', 'stressed', 'uncertain', 'sadness',
+    'disappointed', 'frustrated', 'anger', 'disgust'
+)
+INTENSITIES = ('low', 'medium', 'high')
+
+_EMOTION_IDS = {emotion: i for i, emotion in enumerate(EMOTIONS)}
+_INTENSITY_IDS = {intensity: i for i, intensity in enumerate(INTENSITIES)}
+_INTENSITY_LABELS = np.array(INTENSITIES)
+
+@dataclass
+class EmotionResultBatch:
+    """
+    Column-oriented batch of emotion results
+    
+    emotion and intensity hold int8 indices into EMOTIONS and INTENSITIES;
+    labels outside those vocabularies are stored as neutral / medium.
+    metrics has one row per result and one column per metric_names entry,
+    with NaN where a result has no value for that metric.
+    """
+    emotion: np.ndarray
+    confidence: np.ndarray
+    timestamp: np.ndarray
+    intensity: np.ndarray
+    metrics: np.ndarray
+    metric_names: Tuple[str, ...]
+    
+    def __len__(self) -> int:
+        return len(self.timestamp)
+    
+    @classmethod
+    def from_results(cls, results: List[EmotionResult]) -> 'EmotionResultBatch':
+        """Build a batch from individual EmotionResult objects"""
+        metric_names = tuple(dict.fromkeys(
+            name for result in results for name in result.additional_metrics
+        ))
+        return cls(
+            emotion=_encode_labels([r.emotion for r in results], _EMOTION_IDS, 'neutral'),
+            confidence=np.array([r.confidence for r in results], dtype=np.float64),
+            timestamp=np.array([r.timestamp for r in results], dtype=np.float64),
+            intensity=_encode_labels([r.intensity for r in results], _INTENSITY_IDS, 'medium'),
+            metrics=_metrics_matrix([r.additional_metrics for r in results], metric_names),
+            metric_names=metric_names
+        )
+    
+    def to_results(self) -> List[EmotionResult]:
+        """Expand the batch back into individual EmotionResult objects"""
+        return [
+            EmotionResult(
+                emotion=EMOTIONS[emotion_id],
+                confidence=float(confidence),
+                timestamp=float(timestamp),
+                intensity=INTENSITIES[intensity_id],
+                additional_metrics={
+                    name: float(value)
+                    for name, value in zip(self.metric_names, row)
+                    if not np.isnan(value)
+                }
+            )
+            for emotion_id, confidence, timestamp, intensity_id, row in zip(
+                self.emotion.tolist(),
+                self.confidence.tolist(),
+                self.timestamp.tolist(),
+                self.intensity.tolist(),
+                self.metrics
+            )
+        ]
+
+def _encode_labels(labels: List[str], ids: Dict[str, int], default: str) -> np.ndarray:
+    """Encode string labels as int8 indices, mapping unknown labels to default"""
+    default_id = ids[default]
+    return np.fromiter(
+        (ids.get(label, default_id) for label in labels),
+        dtype=np.int8,
+        count=len(labels)
+    )
+
+def _metrics_matrix(metrics: List[Dict[str, float]], metric_names: Tuple[str, ...]) -> np.ndarray:
+    """Stack per-result metric dicts into an (n_results, n_metrics) float matrix"""
+    matrix = np.full((len(metrics), len(metric_names)), np.nan, dtype=np.float64)
+    for i, row in enumerate(metrics):
+        for j, name in enumerate(metric_names):
+            if name in row:
+                matrix[i, j] = row[name]
+    return matrix
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _pitch_stats(pitches: np.ndarray) -> Tuple[float, float]:
+    """Mean and std of the positive entries of a piptrack pitch matrix in one pass"""
+    total = 0.0
+    total_sq = 0.0
+    count = 0
+    for i in prange(pitches.shape[0]):
+        for j in range(pitches.shape[1]):
+            value = pitches[i, j]
+            if value > 0:
+                total += value
+                total_sq += value * value
+                count += 1
+    
+    if count == 0:
+        return 0.0, 0.0
+    
+    mean = total / count
+    variance = max(total_sq / count - mean * mean, 0.0)
+    return mean, np.sqrt(variance)
+
+def _extract_json_object(text: str) -> Optional[str]:
+    """Return the first balanced {...} object in text, ignoring braces inside strings"""
+    start = text.find('{')
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    
+    return None
+
+def _validate_gemini_result(
+    result: Dict
+) -> Tuple[Optional[str], Optional[float], Optional[str]]:
+    """Return Gemini's (emotion, confidence, intensity), with None for invalid values"""
+    emotion = result.get('emotion')
+    emotion = emotion.strip().lower() if isinstance(emotion, str) and emotion.strip() else None
+    
+    confidence = result.get('confidence')
+    if isinstance(confidence, bool):
+        confidence = None
+    else:
+        try:
+            confidence = float(confidence)
+        except (TypeError, ValueError):
+            confidence = None
+    if confidence is not None and not 0.0 <= confidence <= 1.0:
+        confidence = None
+    
+    intensity = result.get('intensity')
+    intensity = intensity.lower() if isinstance(intensity, str) else None
+    if intensity not in INTENSITIES:
+        intensity = None
+    
+    return emotion, confidence, intensity
+
+class SequenceClassifier:
+    """
+    Tokenizer + sequence classification model run as batched forward passes
+    """
+    
+    def __init__(
+        self, 
+        model_name: str, 
+        device: torch.device, 
+        max_length: int = 128,
+        quantize: bool = True
+    ):
+        """
+        Load tokenizer and model, using fp16 + torch.compile on CUDA
+        
+        On CPU the Linear layers are quantized to int8 unless quantize is
+        False, e.g. when the weights are to be shared across processes.
+        """
+        self.device = device
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        
+        # Load straight into the target dtype; safetensors weights are mmapped
+        # rather than copied into a full fp32 state dict first
+        model = AutoModelForSequenceClassification.from_pretrained(
+            model_name,
+            torch_dtype=torch.float16 if device.type == 'cuda' else torch.float32,
+            low_cpu_mem_usage=True
+        )
+        model = model.to(device).eval()
+        self.id2label = model.config.id2label
+        
+        # CPU inference is dominated by the Linear layers; run them in int8
+        self.quantized = device.type == 'cpu' and quantize
+        if self.quantized:
+            model = quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        
+        # Fused kernels only pay off on GPU; CPU runs eagerly. Batch size and
+        # sequence length vary per request, so compile for dynamic shapes
+        if device.type == 'cuda' and hasattr(torch, 'compile'):
+            model = torch.compile(model, dynamic=True)
+        self.model = model
+    
+    def share_memory(self) -> None:
+        """
+        Move CPU weights to shared memory so forked workers don't copy them
+        
+        Quantized Linear weights live in packed params, which are neither
+        parameters nor buffers, so only the remaining weights (embeddings,
+        LayerNorm) are shared for a quantized model.
+        """
+        if self.device.type != 'cpu':
+            return
+        if self.quantized:
+            print("⚠️  Text model is int8 quantized; only non-Linear weights will be shared")
+        self.model.share_memory()
+    
+    def warmup(self, batch_size: int = 16) -> None:
+        """Run a short single text and a full batch at max_length through the model"""
+        self(["warmup"], batch_size=batch_size)
+        self(["warmup " * self.max_length] * batch_size, batch_size=batch_size)
+    
+    def __call__(self, texts: List[str], batch_size: int = 16) -> List[Dict]:
+        """Return the top {'label', 'score'} prediction for each text"""
+        results = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="pt"
+            ).to(self.device)
+            
+            with torch.inference_mode():
+                logits = self.model(**inputs).logits
+                scores, label_ids = torch.softmax(logits.float(), dim=-1).max(dim=-1)
+            
+            results.extend(
+                {'label': self.id2label[label_id], 'score': score}
+                for label_id, score in zip(label_ids.tolist(), scores.tolist())
+            )
+        return results
+
+class AudioClassifier:
+    """
+    Feature extractor + audio classification model run as batched forward passes
+    """
+    
+    def __init__(self, model_name: str, device: torch.device):
+        """Load feature extractor and model, using fp16 on CUDA"""
+        self.device = device
+        self.feature_extractor = AutoFeatureExtractor.from_pretrained(model_name)
+        self.sampling_rate = self.feature_extractor.sampling_rate
+        
+        model = AutoModelForAudioClassification.from_pretrained(
+            model_name,
+            torch_dtype=torch.float16 if device.type == 'cuda' else torch.float32,
+            low_cpu_mem_usage=True
+        )
+        self.model = model.to(device).eval()
+        
+        # Normalize labels once so results can be mapped without lower()
+        self.id2label = {i: label.lower() for i, label in model.config.id2label.items()}
+    
+    def __call__(self, waveforms: List[np.ndarray], batch_size: int = 8) -> List[Dict]:
+        """Return the top {'label', 'score'} prediction for each waveform at sampling_rate"""
+        results = []
+        for start in range(0, len(waveforms), batch_size):
+            inputs = self.feature_extractor(
+                waveforms[start:start + batch_size],
+                sampling_rate=self.sampling_rate,
+                padding=True,
+                return_tensors="pt"
+            ).to(self.device)
+            inputs['input_values'] = inputs['input_values'].to(self.model.dtype)
+            
+            with torch.inference_mode(), torch.autocast(
+                self.device.type, 
+                dtype=torch.float16, 
+                enabled=self.device.type == 'cuda'
+            ):
+                logits = self.model(**inputs).logits
+            
+            # Softmax in fp32 on the host
+            scores, label_ids = torch.softmax(logits.float().cpu(), dim=-1).max(dim=-1)
+            results.extend(
+                {'label': self.id2label[label_id], 'score': score}
+                for label_id, score in zip(label_ids.tolist(), scores.tolist())
+            )
+        return results
+
+class ONNXSequenceClassifier(SequenceClassifier):
+    """
+    SequenceClassifier backed by an ONNX Runtime session
+    """
+    
+    def __init__(self, model_name: str, device: torch.device, max_length: int = 128):
+        """Export the model to ONNX on first use and load it from the on-disk cache"""
+        self.device = device
+        self.max_length = max_length
+        
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session_options.intra_op_num_threads = os.cpu_count() or 1
+        
+        # The plain onnxruntime wheel is CPU-only, so check for CUDA support too
+        available_providers = ort.get_available_providers()
+        if device.type == 'cuda' and 'CUDAExecutionProvider' in available_providers:
+            provider = 'CUDAExecutionProvider'
+        elif 'OpenVINOExecutionProvider' in available_providers:
+            provider = 'OpenVINOExecutionProvider'
+        else:
+            provider = 'CPUExecutionProvider'
+        
+        # Inputs must live where the session runs
+        if provider != 'CUDAExecutionProvider':
+            self.device = torch.device('cpu')
+        
+        export_dir = os.path.join(ONNX_CACHE_DIR, model_name.replace('/', '--'))
+        if not self._is_complete_export(export_dir):
+            self._export(model_name, export_dir)
+        
+        model = ORTModelForSequenceClassification.from_pretrained(
+            export_dir,
+            provider=provider,
+            session_options=session_options
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        
+        self.id2label = model.config.id2label
+        self.model = model
+    
+    def share_memory(self) -> None:
+        """ONNX Runtime sessions own their weights; nothing to share"""
+    
+    @staticmethod
+    def _is_complete_export(export_dir: str) -> bool:
+        """Check that a cached export has the model, config and tokenizer files"""
+        return all(
+            os.path.isfile(os.path.join(export_dir, name))
+            for name in ('model.onnx', 'config.json', 'tokenizer_config.json')
+        )
+    
+    @classmethod
+    def _export(cls, model_name: str, export_dir: str) -> None:
+        """Export to a temporary directory and move it into place once complete"""
+        os.makedirs(ONNX_CACHE_DIR, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='.export-', dir=ONNX_CACHE_DIR)
+        try:
+            model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+            model.save_pretrained(tmp_dir)
+            AutoTokenizer.from_pretrained(model_name).save_pretrained(tmp_dir)
+            
+            # Another process may have finished the same export meanwhile
+            if cls._is_complete_export(export_dir):
+                return
+            
+            # Drop an incomplete export left behind by an interrupted run
+            if os.path.isdir(export_dir):
+                shutil.rmtree(export_dir, ignore_errors=True)
+            try:
+                os.replace(tmp_dir, export_dir)
+            except OSError:
+                # Lost a race with another process finishing just now
+                if not cls._is_complete_export(export_dir):
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
 class AdvancedEmotionDetector:
     """
     Advanced emotion detection system supporting multiple modalities
     """
     
-    def __init__(self, google_api_key: Optional[str] = None):
-        """Initialize the emotion detector with necessary models"""
+    # Number of texts sent through the text models per forward pass
+    TEXT_BATCH_SIZE = 16
+    
+    # Sample rate expected by the HuBERT audio emotion model
+    AUDIO_MODEL_SAMPLE_RATE = 16000
+    
+    # Live stream PCM format and how it is windowed for classification
+    STREAM_SAMPLE_RATE = 16000
+    STREAM_WINDOW_SECONDS = 1.5
+    STREAM_MAX_BATCH = 8
+    STREAM_MAX_QUEUED_WINDOWS = 16
+    
+    # How long streaming results are coalesced before a callback POST
+    CALLBACK_FLUSH_SECONDS = 0.1
+    CALLBACK_MAX_BATCH = 32
+    
+    # Score cut-offs between low/medium/high intensity, for searchsorted with
+    # side='right'; the upper bound is nudged so a score equal to it stays medium
+    _TEXT_INTENSITY_THRESHOLDS = np.array([0.4, np.nextafter(0.8, np.inf)])
+    _AUDIO_INTENSITY_THRESHOLDS = np.array([0.3, np.nextafter(0.7, np.inf)])
+    
+    # Keys returned by _calculate_text_metrics, in EmotionResultBatch column order
+    TEXT_METRIC_NAMES = (
+        'word_count', 'hesitation_ratio', 'confidence_ratio', 
+        'speech_complexity', 'speech_pace'
+    )
+    
+    # Maximum number of Gemini responses kept in the LRU cache
+    GEMINI_CACHE_SIZE = 1024
+    
+    # Hesitation and confidence markers, matched in a single scan; hesitation
+    # phrases come first so "you know" isn't also counted as confident "know"
+    _MARKER_RE = re.compile(
+        r"\b(?:"
+        r"(?P<hesitation>um|uh|like|you\s+know|i\s+mean|sort\s+of|kind\s+of)"
+        r"|(?P<confidence>definitely|absolutely|certainly|sure|confident|know)"
+        r")\b",
+        re.IGNORECASE
+    )
+    
+    def __init__(
+        self, 
+        google_api_key: Optional[str] = None, 
+        use_onnx: bool = False,
+        warmup: bool = True,
+        share_weights: bool = False
+    ):
+        """
+        Initialize the emotion detector with necessary models
+        
+        With warmup enabled, each model and kernel runs once on dummy input so
+        CUDA context setup, JIT compilation and kernel autotuning happen here
+        rather than on the first real request.
+        
+        share_weights keeps CPU text models in fp32 instead of int8 so that
+        share_memory() can share all of their weights with forked workers.
+        """
         self.google_api_key = google_api_key or os.getenv('GOOGLE_AI_API_KEY')
+        self.use_onnx = use_onnx
+        self.warmup = warmup
+        self.share_weights = share_weights
+        
+        # Shared HTTP session and Gemini worker threads, both created on first
+        # use so the detector can be reused after aclose()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._gemini_executor: Optional[ThreadPoolExecutor] = None
+        
+        # Gemini responses keyed by a hash of the whitespace-normalized text
+        self._gemini_cache: "OrderedDict[bytes, Dict]" = OrderedDict()
+        
+        if warmup:
+            # Compile numba kernels up front so the first request doesn't pay for it
+            _pitch_stats(np.zeros((16, 16), dtype=np.float32))
+            
+            # Likewise for the FFT setup behind the fixed 16 kHz feature path
+            self._extract_audio_features_16k_fixed(np.zeros(16000, dtype=np.float32))
         
         # Initialize models
         self._init_text_models()
@@ -44,35 +534,64 @@ class AdvancedEmotionDetector:
     def _init_text_models(self):
         """Initialize text-based emotion detection models"""
         try:
+            device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            
+            classifier_cls = partial(SequenceClassifier, quantize=not self.share_weights)
+            if self.use_onnx:
+                if ort is not None:
+                    classifier_cls = ONNXSequenceClassifier
+                else:
+                    print("⚠️  optimum[onnxruntime] not installed, using PyTorch text models")
+            
             # Hugging Face emotion classifier
-            self.text_classifier = pipeline(
-                "text-classification",
-                model="j-hartmann/emotion-english-distilroberta-base",
-                device=0 if torch.cuda.is_available() else -1
+            self.text_classifier = classifier_cls(
+                "j-hartmann/emotion-english-distilroberta-base",
+                device
             )
             
             # For more detailed sentiment analysis
-            self.sentiment_analyzer = pipeline(
-                "sentiment-analysis",
-                model="cardiffnlp/twitter-roberta-base-sentiment-latest",
-                device=0 if torch.cuda.is_available() else -1
+            self.sentiment_analyzer = classifier_cls(
+                "cardiffnlp/twitter-roberta-base-sentiment-latest",
+                device
             )
             
+            if self.warmup:
+                self.text_classifier.warmup(self.TEXT_BATCH_SIZE)
+                self.sentiment_analyzer.warmup(self.TEXT_BATCH_SIZE)
+            
             print("✅ Text emotion models loaded successfully")
         except Exception as e:
             print(f"⚠️  Error loading text models: {e}")
             self.text_classifier = None
             self.sentiment_analyzer = None
     
+    def share_memory(self) -> None:
+        """
+        Share text model weights with worker processes
+        
+        Call in the parent process before forking workers so each worker
+        maps the same weights instead of loading its own copy. On CPU this
+        needs share_weights=True at construction; int8 quantized Linear
+        weights can't be placed in shared memory.
+        """
+        for classifier in (self.text_classifier, self.sentiment_analyzer):
+            if classifier:
+                classifier.share_memory()
+    
     def _init_audio_models(self):
         """Initialize audio-based emotion detection models"""
         try:
+            device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            
             # Audio emotion classifier
-            self.audio_classifier = pipeline(
-                "audio-classification",
-                model="superb/hubert-large-superb-er",
-                device=0 if torch.cuda.is_available() else -1
+            self.audio_classifier = AudioClassifier(
+                "superb/hubert-large-superb-er",
+                device
             )
+            
+            if self.warmup:
+                self.audio_classifier([np.zeros(self.AUDIO_MODEL_SAMPLE_RATE, dtype=np.float32)])
+            
             print("✅ Audio emotion models loaded successfully")
         except Exception as e:
             print(f"⚠️  Error loading audio models: {e}")
@@ -87,74 +606,163 @@ class AdvancedEmotionDetector:
         """
         Analyze emotion in text using multiple approaches
         """
+        results = await self.analyze_text_emotions_batch(
+            [(text, timestamp)],
+            use_gemini=use_gemini
+        )
+        return results[0]
+    
+    async def analyze_text_emotions_batch(
+        self, 
+        items: List[Tuple[str, float]], 
+        use_gemini: bool = True
+    ) -> List[EmotionResult]:
+        """
+        Analyze emotion for a batch of (text, timestamp) pairs
+        """
+        emotions, confidences, intensities = await self._analyze_text_batch(items, use_gemini)
+        
+        return [
+            EmotionResult(
+                emotion=emotion,
+                confidence=confidence,
+                timestamp=timestamp,
+                intensity=intensity,
+                additional_metrics=self._calculate_text_metrics(text)
+            )
+            for (text, timestamp), emotion, confidence, intensity
+            in zip(items, emotions, confidences, intensities)
+        ]
+    
+    async def analyze_text_emotions_columnar(
+        self, 
+        items: List[Tuple[str, float]], 
+        use_gemini: bool = True
+    ) -> EmotionResultBatch:
+        """
+        Analyze a batch of (text, timestamp) pairs into column arrays
+        """
+        emotions, confidences, intensities = await self._analyze_text_batch(items, use_gemini)
         
-        # Primary analysis with Hugging Face model
-        primary_emotion = self._analyze_with_hf_models(text)
+        metrics = np.empty((len(items), len(self.TEXT_METRIC_NAMES)), dtype=np.float64)
+        for i, (text, _) in enumerate(items):
+            metrics[i] = self._text_metric_values(text)
+        
+        return EmotionResultBatch(
+            emotion=_encode_labels(emotions, _EMOTION_IDS, 'neutral'),
+            confidence=np.array(confidences, dtype=np.float64),
+            timestamp=np.array([timestamp for _, timestamp in items], dtype=np.float64),
+            intensity=_encode_labels(intensities, _INTENSITY_IDS, 'medium'),
+            metrics=metrics,
+            metric_names=self.TEXT_METRIC_NAMES
+        )
+    
+    async def _analyze_text_batch(
+        self, 
+        items: List[Tuple[str, float]], 
+        use_gemini: bool
+    ) -> Tuple[List[str], List[float], List[str]]:
+        """Return emotion, confidence and intensity columns for (text, timestamp) pairs"""
+        if not items:
+            return [], [], []
+        
+        texts = [text for text, _ in items]
+        
+        # Primary analysis with Hugging Face models, batched forward passes run
+        # off the event loop so concurrent work (e.g. audio) isn't blocked
+        emotions, confidences, intensities = await asyncio.to_thread(
+            self._analyze_with_hf_models_columns, 
+            texts
+        )
         
         # Enhanced analysis with Gemini if available
         if use_gemini and self.google_api_key:
-            gemini_result = await self._analyze_with_gemini(text)
-            # Combine results (prioritize Gemini for confidence)
-            if gemini_result:
-                primary_emotion.update(gemini_result)
-        
-        # Calculate additional metrics
-        additional_metrics = self._calculate_text_metrics(text)
-        
-        return EmotionResult(
-            emotion=primary_emotion.get('emotion', 'neutral'),
-            confidence=primary_emotion.get('confidence', 0.5),
-            timestamp=timestamp,
-            intensity=primary_emotion.get('intensity', 'medium'),
-            additional_metrics=additional_metrics
-        )
+            gemini_results = await asyncio.gather(
+                *(self._analyze_with_gemini(text) for text in texts)
+            )
+            # Combine results (prioritize Gemini), keeping ours where its values are invalid
+            for i, gemini_result in enumerate(gemini_results):
+                if not gemini_result:
+                    continue
+                emotion, confidence, intensity = _validate_gemini_result(gemini_result)
+                if emotion is not None:
+                    emotions[i] = emotion
+                if confidence is not None:
+                    confidences[i] = confidence
+                if intensity is not None:
+                    intensities[i] = intensity
+        
+        return emotions, confidences, intensities
     
     def _analyze_with_hf_models(self, text: str) -> Dict:
         """Analyze text with Hugging Face models"""
-        result = {'emotion': 'neutral', 'confidence': 0.5, 'intensity': 'medium'}
+        emotions, confidences, intensities = self._analyze_with_hf_models_columns([text])
+        return {'emotion': emotions[0], 'confidence': confidences[0], 'intensity': intensities[0]}
+    
+    def _analyze_with_hf_models_columns(
+        self, 
+        texts: List[str]
+    ) -> Tuple[List[str], List[float], List[str]]:
+        """Analyze a batch of texts with Hugging Face models into label/score columns"""
+        emotions = ['neutral'] * len(texts)
+        confidences = [0.5] * len(texts)
+        intensities = ['medium'] * len(texts)
         
         if not self.text_classifier:
-            return result
+            return emotions, confidences, intensities
         
         try:
             # Get emotion classification
-            emotion_results = self.text_classifier(text)
-            if emotion_results:
-                top_result = emotion_results[0]
-                result['emotion'] = top_result['label'].lower()
-                result['confidence'] = top_result['score']
+            emotion_results = self.text_classifier(
+                texts, 
+                batch_size=self.TEXT_BATCH_SIZE
+            )
+            for i, top_result in enumerate(emotion_results):
+                emotions[i] = top_result['label'].lower()
+                confidences[i] = top_result['score']
             
             # Get sentiment for additional context
             if self.sentiment_analyzer:
-                sentiment_results = self.sentiment_analyzer(text)
-                if sentiment_results:
-                    sentiment = sentiment_results[0]['label'].lower()
-                    sentiment_score = sentiment_results[0]['score']
+                sentiment_results = self.sentiment_analyzer(
+                    texts, 
+                    batch_size=self.TEXT_BATCH_SIZE
+                )
+                for i, sentiment_result in enumerate(sentiment_results):
+                    sentiment = sentiment_result['label'].lower()
+                    sentiment_score = sentiment_result['score']
                     
                     # Adjust emotion based on sentiment
                     if sentiment == 'negative' and sentiment_score > 0.7:
-                        if result['emotion'] in ['joy', 'optimism']:
-                            result['emotion'] = 'disappointed'
+                        if emotions[i] in ['joy', 'optimism']:
+                            emotions[i] = 'disappointed'
                     elif sentiment == 'positive' and sentiment_score > 0.7:
-                        if result['emotion'] in ['sadness', 'fear']:
-                            result['emotion'] = 'confident'
+                        if emotions[i] in ['sadness', 'fear']:
+                            emotions[i] = 'confident'
             
             # Determine intensity
-            if result['confidence'] > 0.8:
-                result['intensity'] = 'high'
-            elif result['confidence'] < 0.4:
-                result['intensity'] = 'low'
+            intensities = _INTENSITY_LABELS[np.searchsorted(
+                self._TEXT_INTENSITY_THRESHOLDS,
+                confidences,
+                side='right'
+            )].tolist()
                 
         except Exception as e:
             print(f"Error in HF analysis: {e}")
         
-        return result
+        return emotions, confidences, intensities
     
     async def _analyze_with_gemini(self, text: str) -> Optional[Dict]:
         """Analyze text with Google Gemini for enhanced emotion detection"""
         if not hasattr(self, 'gemini_model'):
             return None
         
+        # Repeated segments (retries, sliding windows) are served from the cache
+        cache_key = blake2b(' '.join(text.split()).encode(), digest_size=16).digest()
+        cached = self._gemini_cache.get(cache_key)
+        if cached is not None:
+            self._gemini_cache.move_to_end(cache_key)
+            return dict(cached)
+        
         try:
             prompt = f"""
             Analyze the emotional tone of this interview response:
@@ -183,19 +791,21 @@ class AdvancedEmotionDetector:
             Return only valid JSON.
             """
             
-            response = await asyncio.get_event_loop().run_in_executor(
-                None, 
-                lambda: self.gemini_model.generate_content(prompt)
+            # Dedicated executor bounds concurrent Gemini calls
+            response = await asyncio.get_running_loop().run_in_executor(
+                self._get_gemini_executor(), 
+                self.gemini_model.generate_content, 
+                prompt
             )
             
             # Extract JSON from response
-            response_text = response.text
-            json_match = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            
-            if json_match != -1 and json_end > json_match:
-                json_str = response_text[json_match:json_end]
-                return json.loads(json_str)
+            json_str = _extract_json_object(response.text)
+            if json_str is not None:
+                result = orjson.loads(json_str)
+                self._gemini_cache[cache_key] = result
+                if len(self._gemini_cache) > self.GEMINI_CACHE_SIZE:
+                    self._gemini_cache.popitem(last=False)
+                return dict(result)
                 
         except Exception as e:
             print(f"Error in Gemini analysis: {e}")
@@ -204,32 +814,61 @@ class AdvancedEmotionDetector:
     
     def _calculate_text_metrics(self, text: str) -> Dict[str, float]:
         """Calculate additional text-based metrics"""
+        return dict(zip(self.TEXT_METRIC_NAMES, self._text_metric_values(text)))
+    
+    def _text_metric_values(self, text: str) -> Tuple[float, ...]:
+        """Calculate text-based metrics as a tuple in TEXT_METRIC_NAMES order"""
         words = text.split()
-        
-        # Basic linguistic features
         word_count = len(words)
-        avg_word_length = np.mean([len(word) for word in words]) if words else 0
         
-        # Hesitation markers
-        hesitation_words = ['um', 'uh', 'like', 'you know', 'i mean', 'sort of', 'kind of']
-        hesitation_count = sum(1 for word in words if word.lower() in hesitation_words)
-        hesitation_ratio = hesitation_count / word_count if word_count > 0 else 0
+        if word_count == 0:
+            return (0.0, 0.0, 0.0, 0.0, 0.0)
         
-        # Confidence markers
-        confidence_words = ['definitely', 'absolutely', 'certainly', 'sure', 'confident', 'know']
-        confidence_count = sum(1 for word in words if word.lower() in confidence_words)
-        confidence_ratio = confidence_count / word_count if word_count > 0 else 0
+        # Hesitation and confidence markers in a single pass
+        hesitation_count = 0
+        confidence_count = 0
+        for match in self._MARKER_RE.finditer(text):
+            if match.lastgroup == 'hesitation':
+                hesitation_count += 1
+            else:
+                confidence_count += 1
+        
+        # Basic linguistic features
+        avg_word_length = sum(map(len, words)) / word_count
         
         # Complexity (approximate)
         complexity = avg_word_length / 5.0  # Normalized to 0-1 scale
         
-        return {
-            'word_count': float(word_count),
-            'hesitation_ratio': hesitation_ratio,
-            'confidence_ratio': confidence_ratio,
-            'speech_complexity': min(complexity, 1.0),
-            'speech_pace': min(word_count / 60.0, 2.0) if word_count > 0 else 0.0  # Approximate words per second
-        }
+        return (
+            float(word_count),
+            hesitation_count / word_count,
+            confidence_count / word_count,
+            min(complexity, 1.0),
+            min(word_count / 60.0, 2.0)  # Approximate words per second
+        )
+    
+    async def analyze_turn(
+        self, 
+        text: str, 
+        audio_file_path: str, 
+        timestamp: float,
+        use_gemini: bool = True
+    ) -> Tuple[EmotionResult, EmotionResult]:
+        """
+        Analyze an interview turn's transcript and audio concurrently
+        
+        Audio analysis is started first in its own worker thread, so librosa
+        and the audio model run alongside the text models (which also run in a
+        worker thread) and the Gemini request.
+        """
+        audio_task = asyncio.create_task(
+            asyncio.to_thread(self.analyze_audio_emotion, audio_file_path, timestamp)
+        )
+        try:
+            text_result = await self.analyze_text_emotion(text, timestamp, use_gemini=use_gemini)
+        finally:
+            audio_result = await audio_task
+        return text_result, audio_result
     
     def analyze_audio_emotion(
         self, 
@@ -250,10 +889,12 @@ class AdvancedEmotionDetector:
         
         try:
             # Load and preprocess audio
-            audio_features = self._extract_audio_features(audio_file_path)
+            audio_features, y, sr = self._extract_audio_features(audio_file_path)
+            if y is None:
+                raise ValueError(f"Could not load audio file {audio_file_path}")
             
-            # Classify emotion
-            emotion_results = self.audio_classifier(audio_file_path)
+            # Classify emotion on the already decoded waveform
+            emotion_results = self.audio_classifier([y])
             
             if emotion_results:
                 top_result = emotion_results[0]
@@ -284,37 +925,57 @@ class AdvancedEmotionDetector:
                 additional_metrics={}
             )
     
-    def _extract_audio_features(self, audio_file_path: str) -> Dict[str, float]:
-        """Extract features from audio for emotion analysis"""
+    def _extract_audio_features(
+        self, 
+        audio_file_path: str
+    ) -> Tuple[Dict[str, float], Optional[np.ndarray], Optional[int]]:
+        """
+        Extract features from audio for emotion analysis
+        
+        Audio is decoded once at the audio model's 16 kHz rate; the waveform
+        and sample rate are returned as well so it can be classified without
+        decoding or resampling the file again.
+        """
         try:
             # Load audio
-            y, sr = librosa.load(audio_file_path, sr=22050)
+            y, sr = librosa.load(audio_file_path, sr=self.AUDIO_MODEL_SAMPLE_RATE)
+        except Exception as e:
+            print(f"Error loading audio: {e}")
+            return {}, None, None
+        
+        return self._extract_audio_features_16k_fixed(y), y, sr
+    
+    def _extract_audio_features_16k_fixed(self, y: np.ndarray) -> Dict[str, float]:
+        """Extract features from a 16 kHz mono waveform with fixed STFT framing"""
+        sr = 16000
+        n_fft = 1024
+        hop_length = 256
+        
+        try:
+            # Shared magnitude spectrogram for all spectral features
+            S, _ = librosa.magphase(librosa.stft(y, n_fft=n_fft, hop_length=hop_length))
             
             # Extract features
             features = {}
             
             # Pitch features
-            pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-            pitch_mean = np.mean(pitches[pitches > 0]) if np.any(pitches > 0) else 0
+            pitches, magnitudes = librosa.piptrack(S=S, sr=sr, n_fft=n_fft, hop_length=hop_length)
+            pitch_mean, pitch_std = _pitch_stats(pitches)
             features['pitch_mean'] = float(pitch_mean)
-            features['pitch_std'] = float(np.std(pitches[pitches > 0])) if np.any(pitches > 0) else 0
+            features['pitch_std'] = float(pitch_std)
             
             # Energy features
-            rms = librosa.feature.rms(y=y)[0]
-            features['energy_mean'] = float(np.mean(rms))
-            features['energy_std'] = float(np.std(rms))
+            rms = librosa.feature.rms(S=S, frame_length=n_fft, hop_length=hop_length)[0]
+            features['energy_mean'] = float(rms.mean())
+            features['energy_std'] = float(rms.std())
             
             # Spectral features
-            spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
-            features['spectral_centroid_mean'] = float(np.mean(spectral_centroids))
+            spectral_centroids = librosa.feature.spectral_centroid(S=S, sr=sr, n_fft=n_fft, hop_length=hop_length)[0]
+            features['spectral_centroid_mean'] = float(spectral_centroids.mean())
             
             # Zero crossing rate (speech clarity indicator)
-            zcr = librosa.feature.zero_crossing_rate(y)[0]
-            features['zcr_mean'] = float(np.mean(zcr))
-            
-            # Tempo
-            tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-            features['tempo'] = float(tempo)
+            zcr = librosa.feature.zero_crossing_rate(y, frame_length=n_fft, hop_length=hop_length)[0]
+            features['zcr_mean'] = float(zcr.mean())
             
             return features
             
@@ -324,17 +985,8 @@ class AdvancedEmotionDetector:
     
     def _map_audio_emotion(self, audio_label: str) -> str:
         """Map audio model output to our emotion labels"""
-        mapping = {
-            'angry': 'frustrated',
-            'calm': 'calm',
-            'disgust': 'disappointed',
-            'fearful': 'nervous',
-            'happy': 'happy',
-            'neutral': 'neutral',
-            'sad': 'disappointed',
-            'surprised': 'excited'
-        }
-        return mapping.get(audio_label.lower(), 'neutral')
+        # AudioClassifier lowercases labels once when the model is loaded
+        return _AUDIO_EMOTION_MAP.get(audio_label, 'neutral')
     
     def _calculate_audio_intensity(self, features: Dict[str, float]) -> str:
         """Calculate emotion intensity based on audio features"""
@@ -345,14 +997,22 @@ class AdvancedEmotionDetector:
         energy = features.get('energy_mean', 0.5)
         pitch_std = features.get('pitch_std', 0.5)
         
+        # Single score: bisect avoids numpy array round-trips
         intensity_score = (energy + pitch_std) / 2
-        
-        if intensity_score > 0.7:
-            return 'high'
-        elif intensity_score < 0.3:
-            return 'low'
-        else:
-            return 'medium'
+        return INTENSITIES[bisect_right(self._AUDIO_INTENSITY_THRESHOLDS, intensity_score)]
+    
+    def _calculate_audio_intensities(
+        self, 
+        energy: np.ndarray, 
+        pitch_std: np.ndarray
+    ) -> List[str]:
+        """Calculate intensity labels for arrays of energy and pitch variation"""
+        intensity_score = (energy + pitch_std) / 2
+        return _INTENSITY_LABELS[np.searchsorted(
+            self._AUDIO_INTENSITY_THRESHOLDS, 
+            intensity_score, 
+            side='right'
+        )].tolist()
     
     async def analyze_streaming_audio(
         self, 
@@ -361,52 +1021,210 @@ class AdvancedEmotionDetector:
     ) -> None:
         """
         Analyze emotion in real-time audio stream
+        
+        The stream is expected to carry 16-bit mono PCM at STREAM_SAMPLE_RATE.
+        Incoming chunks are accumulated into fixed-length windows which a
+        background task classifies in batches. Audio left over when the stream
+        ends is zero-padded into a final window. Results are coalesced and
+        POSTed to the callback as {"events": [...]}.
         """
-        # This would connect to the Vapi.ai audio stream
-        # and process chunks in real-time
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(audio_stream_url) as resp:
-                    async for chunk in resp.content.iter_chunked(8192):
-                        # Process audio chunk
-                        # This is a simplified example
-                        emotion_result = await self._process_audio_chunk(chunk)
+        window_bytes = int(self.STREAM_SAMPLE_RATE * self.STREAM_WINDOW_SECONDS) * 2
+        # Bounded so a classifier slower than real time applies backpressure
+        # to the stream instead of buffering PCM without limit
+        windows: asyncio.Queue = asyncio.Queue(maxsize=self.STREAM_MAX_QUEUED_WINDOWS)
+        events: asyncio.Queue = asyncio.Queue()
+        
+        session = await self._get_session()
+        consumer = asyncio.create_task(self._consume_audio_windows(windows, events))
+        sender = asyncio.create_task(
+            self._send_emotion_callbacks(events, session, callback_url)
+        )
+        buffer = bytearray()
+        window_index = 0
+        try:
+            async with session.get(audio_stream_url) as resp:
+                async for chunk in resp.content.iter_chunked(8192):
+                    buffer.extend(chunk)
+                    
+                    # Hand off every complete window to the consumer
+                    while len(buffer) >= window_bytes:
+                        pcm = np.frombuffer(bytes(buffer[:window_bytes]), dtype=np.int16)
+                        del buffer[:window_bytes]
+                        await windows.put((
+                            window_index * self.STREAM_WINDOW_SECONDS,
+                            pcm.astype(np.float32) / 32768.0
+                        ))
+                        window_index += 1
                         
-                        # Send result to callback
-                        if emotion_result:
-                            await self._send_emotion_callback(
-                                session, 
-                                callback_url, 
-                                emotion_result
-                            )
-                            
+        except Exception as e:
+            print(f"Error in streaming analysis: {e}")
+        finally:
+            try:
+                # Flush the tail (often the end of an answer), padded to a full
+                # window so the batch can still be stacked
+                tail = bytes(buffer[:len(buffer) - len(buffer) % 2])
+                if tail and not consumer.done():
+                    pcm = np.frombuffer(tail.ljust(window_bytes, b'\0'), dtype=np.int16)
+                    await windows.put((
+                        window_index * self.STREAM_WINDOW_SECONDS,
+                        pcm.astype(np.float32) / 32768.0
+                    ))
+                
+                # Signal end of stream and wait for pending windows
+                if not consumer.done():
+                    await windows.put(None)
+                await consumer
+            finally:
+                # Always let the sender flush and exit, even if the consumer failed
+                await events.put(None)
+                await sender
+    
+    async def _consume_audio_windows(
+        self, 
+        windows: asyncio.Queue, 
+        events: asyncio.Queue
+    ) -> None:
+        """Classify queued audio windows in batches and queue the results"""
+        done = False
+        while not done:
+            batch = [await windows.get()]
+            while len(batch) < self.STREAM_MAX_BATCH and not windows.empty():
+                batch.append(windows.get_nowait())
+            
+            # The end-of-stream marker is always the last item queued
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            if not batch:
+                continue
+            
+            # Keep draining on errors so the producer never blocks on a full queue
+            try:
+                emotion_results = await asyncio.to_thread(self._classify_audio_windows, batch)
             except Exception as e:
-                print(f"Error in streaming analysis: {e}")
+                print(f"Error processing audio windows: {e}")
+                continue
+            
+            for emotion_result in emotion_results:
+                events.put_nowait(emotion_result)
     
-    async def _process_audio_chunk(self, chunk: bytes) -> Optional[EmotionResult]:
-        """Process individual audio chunk"""
-        # This would implement real-time audio processing
-        # For now, return None as this requires more complex implementation
-        return None
+    def _classify_audio_windows(
+        self, 
+        windows: List[Tuple[float, np.ndarray]]
+    ) -> List[EmotionResult]:
+        """Classify a batch of (timestamp, waveform) stream windows in one call"""
+        if not self.audio_classifier:
+            return []
+        
+        waveforms = [y for _, y in windows]
+        if self.STREAM_SAMPLE_RATE != self.AUDIO_MODEL_SAMPLE_RATE:
+            waveforms = [
+                librosa.resample(y, orig_sr=self.STREAM_SAMPLE_RATE, target_sr=self.AUDIO_MODEL_SAMPLE_RATE)
+                for y in waveforms
+            ]
+        
+        try:
+            emotion_results = self.audio_classifier(
+                waveforms,
+                batch_size=len(windows)
+            )
+        except Exception as e:
+            print(f"Error classifying audio windows: {e}")
+            return []
+        
+        # Windows are equal length, so energy and intensity run over the whole batch
+        stacked = np.stack([y for _, y in windows])
+        energy = np.sqrt(np.square(stacked, out=stacked).mean(axis=1))
+        intensities = self._calculate_audio_intensities(energy, np.full_like(energy, 0.5))
+        
+        results = []
+        for (timestamp, _), top_result, window_energy, intensity in zip(
+            windows, emotion_results, energy.tolist(), intensities
+        ):
+            results.append(EmotionResult(
+                emotion=self._map_audio_emotion(top_result['label']),
+                confidence=top_result['score'],
+                timestamp=timestamp,
+                intensity=intensity,
+                additional_metrics={'energy_mean': window_energy}
+            ))
+        
+        return results
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=60)
+            )
+        return self._session
+    
+    def _get_gemini_executor(self) -> ThreadPoolExecutor:
+        """Return the Gemini worker pool, creating it on first use"""
+        if self._gemini_executor is None:
+            self._gemini_executor = ThreadPoolExecutor(max_workers=4)
+        return self._gemini_executor
+    
+    async def aclose(self) -> None:
+        """Close the shared HTTP session and Gemini worker threads"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self._gemini_executor is not None:
+            self._gemini_executor.shutdown(wait=False)
+        self._gemini_executor = None
+    
+    async def _send_emotion_callbacks(
+        self, 
+        events: asyncio.Queue, 
+        session: aiohttp.ClientSession, 
+        callback_url: str
+    ) -> None:
+        """Coalesce queued emotion results and send them to the callback in batches"""
+        done = False
+        while not done:
+            batch = [await events.get()]
+            if batch[0] is not None:
+                # Give results arriving shortly after the first one a chance to join
+                await asyncio.sleep(self.CALLBACK_FLUSH_SECONDS)
+            while len(batch) < self.CALLBACK_MAX_BATCH and not events.empty():
+                batch.append(events.get_nowait())
+            
+            # The end-of-stream marker is always the last item queued
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            if batch:
+                await self._send_emotion_callback(session, callback_url, batch)
     
     async def _send_emotion_callback(
         self, 
         session: aiohttp.ClientSession, 
         callback_url: str, 
-        emotion_result: EmotionResult
+        emotion_results: List[EmotionResult]
     ) -> None:
-        """Send emotion result to callback URL"""
-        try:
-            await session.post(
-                callback_url,
-                json={
+        """Send a batch of emotion results to callback URL"""
+        payload = {
+            'events': [
+                {
                     'emotion': emotion_result.emotion,
                     'confidence': emotion_result.confidence,
                     'timestamp': emotion_result.timestamp,
                     'intensity': emotion_result.intensity,
                     'additional_metrics': emotion_result.additional_metrics
                 }
-            )
+                for emotion_result in emotion_results
+            ]
+        }
+        
+        try:
+            # Release the response so the connection returns to the shared pool
+            async with session.post(
+                callback_url,
+                data=orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+                headers={'Content-Type': 'application/json'}
+            ):
+                pass
         except Exception as e:
             print(f"Error sending callback: {e}")
 
@@ -430,6 +1248,8 @@ async def main():
     print(f"Confidence: {result.confidence:.2f}")
     print(f"Intensity: {result.intensity}")
     print(f"Additional Metrics: {result.additional_metrics}")
+    
+    await detector.aclose()
 
 if __name__ == "__main__":
     asyncio.run(main())